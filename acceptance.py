@@ -1,6 +1,9 @@
+from collections import Counter
+from functools import cache
+
 from group_finder import find_simple_waits_for_two_tiles
 from mahjong_objects import MahjongTiles, MahjongCombination, MahjongTile, get_tiles_from_family, Family, MahjongGroups, \
-    MahjongGroup
+    MahjongGroup, INDEX_TO_TILE
 
 
 def get_full_tile_acceptance(
@@ -21,16 +24,15 @@ def get_full_tile_acceptance(
     has_empty_group = False
     for groups, _ in combinations:
         acceptance.update(get_tile_acceptance_of_groups(groups))
-        if _has_empty_group(groups):
+        if not has_empty_group and not all(groups):
             has_empty_group = True
     if allowed_tiles and has_empty_group:
+        tile_counts = Counter(tiles_in_hand)
         honor_tiles = get_tiles_from_family(allowed_tiles, Family.HONOR)
-        for tile in honor_tiles:
-            if tile not in acceptance and tiles_in_hand.count(tile) < 2:
-                acceptance.add(tile)
-        for tile in set(allowed_tiles) - set(honor_tiles):
-            if tile not in acceptance and tiles_in_hand.count(tile) < 4:
-                acceptance.add(tile)
+        acceptance.update(tile for tile in honor_tiles if tile_counts[tile] < 2)
+        acceptance.update(
+            tile for tile in set(allowed_tiles).difference(honor_tiles) if tile_counts[tile] < 4
+        )
     if allowed_tiles:
         acceptance.intersection_update(allowed_tiles)
     if other_acceptance:
@@ -40,37 +42,46 @@ def get_full_tile_acceptance(
 
 def get_tile_acceptance_of_groups(groups: MahjongGroups) -> set[MahjongTile]:
     acceptance = set()
-    number_of_pairs = sum(_is_pair(group) for group in groups)
-    for group in groups:
-        if len(group) == 3:
+    are_pairs = [_is_pair(group) for group in groups]
+    number_of_pairs = sum(are_pairs)
+    for group, is_pair in zip(groups, are_pairs):
+        group_size = len(group)
+        if group_size == 3 or group_size == 0:
+            # empty groups are not managed here
             continue
-        if len(group) == 2:
-            if _is_pair(group) and number_of_pairs == 1:
+        if group_size == 2:
+            if is_pair and number_of_pairs == 1:
                 continue
-            acceptance.update(find_simple_waits_for_two_tiles(group))
-        elif len(group) == 0:
-            # not managed here
-            continue
+            acceptance.update(_get_two_tiles_waits(group))
         elif number_of_pairs > 0:
-            tile_value = group[0].number
-            tile_family = group[0].family
-            if tile_family == Family.HONOR:
-                acceptance.add(group[0])
-            else:
-                for neighbour in range(-2, 3):
-                    if 1 <= tile_value + neighbour <= 9:
-                        acceptance.add(
-                            MahjongTile(
-                                number=tile_value + neighbour, family=tile_family
-                            )
-                        )
+            acceptance.update(_SINGLE_TILE_WAITS_WITH_PAIR[group[0].index])
         else:
             acceptance.add(group[0])
     return acceptance
 
 
-def _has_empty_group(groups):
-    return any(len(group) == 0 for group in groups)
+@cache
+def _get_two_tiles_waits(group: MahjongGroup) -> tuple[MahjongTile, ...]:
+    return tuple(find_simple_waits_for_two_tiles(group))
+
+
+def _build_single_tile_waits_with_pair() -> tuple[tuple[MahjongTile, ...], ...]:
+    """Waits of an isolated tile when the hand already has its pair, by tile index:
+    the tile itself for honors, and the tiles up to two steps away for suited tiles"""
+    waits = []
+    for tile in INDEX_TO_TILE:
+        if tile.family == Family.HONOR:
+            waits.append((tile,))
+        else:
+            waits.append(tuple(
+                INDEX_TO_TILE[tile.index + neighbour]
+                for neighbour in range(-2, 3)
+                if 1 <= tile.number + neighbour <= 9
+            ))
+    return tuple(waits)
+
+
+_SINGLE_TILE_WAITS_WITH_PAIR = _build_single_tile_waits_with_pair()
 
 
 def _is_pair(group: MahjongGroup) -> bool:
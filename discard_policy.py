@@ -26,7 +26,7 @@ ones), and the contribution is weighted by hand value -> the policy is value
 aware, which matters because MCR requires a >= 8 point hand.
 """
 import os
-from collections import defaultdict
+from collections import Counter, defaultdict
 from functools import lru_cache
 
 from acceptance import get_tile_acceptance_of_groups
@@ -144,6 +144,7 @@ def get_value_weighted_discard(
     if not per_tile_type_acc:
         raise ValueError("No tile to discard")
 
+    tile_counts = Counter(hand.hand_tiles)
     scores: dict[MahjongTile, float] = {}
     for tile, type_accs in per_tile_type_acc.items():
         score = 0.0
@@ -155,7 +156,7 @@ def get_value_weighted_discard(
             value = min(value, VALUE_CAP)
             proximity = DECAY ** (away_by_type[hand_type] - min_away)
             score += (value ** ALPHA) * proximity * _get_acceptance_tile_number(
-                hand, acc
+                hand, acc, tile_counts
             )
         scores[tile] = score
 
@@ -276,9 +277,10 @@ def get_expectimax_discard(
         raise ValueError("No tile to discard")
 
     # Prune candidate discards to the top-k by immediate acceptance count.
+    tile_counts = Counter(hand.hand_tiles)
     ranked = sorted(
         candidate_acc.items(),
-        key=lambda item: _get_acceptance_tile_number(hand, item[1]),
+        key=lambda item: _get_acceptance_tile_number(hand, item[1], tile_counts),
         reverse=True,
     )
     candidates = [tile for tile, _acc in ranked[:k]]
@@ -513,9 +515,10 @@ def get_oracle_rollout_discard(
     if not candidate_acc:
         raise ValueError("No tile to discard")
 
+    tile_counts = Counter(hand.hand_tiles)
     ranked = sorted(
         candidate_acc.items(),
-        key=lambda item: _get_acceptance_tile_number(hand, item[1]),
+        key=lambda item: _get_acceptance_tile_number(hand, item[1], tile_counts),
         reverse=True,
     )
     candidates = [tile for tile, _acc in ranked[:k]]
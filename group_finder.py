@@ -3,8 +3,9 @@ functions to find all the best groups (that minimize the number of tiles away)
 """
 
 from bisect import insort
-from collections import Counter, defaultdict
-from typing import Iterator
+from collections import defaultdict
+from functools import lru_cache
+from typing import Callable, Iterator
 
 from mahjong_objects import (
     MahjongGroup,
@@ -15,22 +16,14 @@ from mahjong_objects import (
     MahjongGroups,
     MahjongCombination,
     MahjongGroupAndResidue,
-    get_tiles_from_family,
     INDEX_TO_TILE,
     NB_TILE_INDICES,
 )
 from tiles_utils import parse_tiles
 
-
-def _get_group(numbers: list[int], family: Family) -> MahjongGroup:
-    return tuple(MahjongTile(number=num, family=family) for num in numbers)
-
-
-def _get_group_residue(group: MahjongGroup, tiles: MahjongTiles) -> MahjongTiles:
-    leftover = list(tiles)
-    for group_tile in group:
-        leftover.remove(group_tile)
-    return leftover
+# a proto-group as enumerated by the search: its ascending tile indices, the
+# tile tuple itself and its group key (see _GROUP_KEYS)
+GroupCandidate = tuple[tuple[int, ...], MahjongGroup, int]
 
 
 def find_simple_waits_for_two_tiles(group: MahjongGroup) -> set[MahjongTile]:
@@ -47,17 +40,24 @@ def find_simple_waits_for_two_tiles(group: MahjongGroup) -> set[MahjongTile]:
         waits.add(tile1)
     elif tile2.number - tile1.number == 1:
         if tile1.number > 1:
-            waits.add(MahjongTile(number=tile1.number - 1, family=tile1.family))
+            waits.add(_same_family_tile(tile1, tile1.number - 1))
         if tile2.number < 9:
-            waits.add(MahjongTile(number=tile2.number + 1, family=tile1.family))
+            waits.add(_same_family_tile(tile1, tile2.number + 1))
     elif tile2.number - tile1.number == 2:
-        waits.add(
-            MahjongTile(number=(tile1.number + tile2.number) // 2, family=tile1.family)
-        )
+        waits.add(_same_family_tile(tile1, (tile1.number + tile2.number) // 2))
     return waits
 
 
-# pylint: disable=too-many-branches
+def _same_family_tile(tile: MahjongTile, number: int) -> MahjongTile:
+    """Interned tile of ``tile``'s family with the given number.
+
+    Looked up by index; honors past 7z (only reachable through the adjacent
+    honor quirk above) have no index and go through the constructor."""
+    if number <= 7 or not tile.is_honor():
+        return INDEX_TO_TILE[tile.index + number - tile.number]
+    return MahjongTile(number=number, family=tile.family)
+
+
 def _get_respected_constraints(
     group: MahjongGroup, constraints: list[Constraint]
 ) -> list[Constraint]:
@@ -68,72 +68,92 @@ def _get_respected_constraints(
     if len(constraints) == 1 and constraints[0] is Constraint.NONE:
         return constraints
 
-    respected_constraints = list(constraints)
+    return [
+        constraint
+        for constraint in constraints
+        if constraint not in _GROUP_CHECKS or _GROUP_CHECKS[constraint](group)
+    ]
+
+
+def _get_group_residue(indices: tuple[int, ...], tiles: MahjongTiles) -> MahjongTiles:
+    """Residue of ``tiles`` once the group tiles (given by index) are taken out.
+
+    Drops the first occurrence of each group tile, like repeated ``list.remove``."""
+    pending = list(indices)
+    residue: MahjongTiles = []
+    for tile in tiles:
+        if pending and tile.index in pending:
+            pending.remove(tile.index)
+        else:
+            residue.append(tile)
+    return residue
 
+
+# per-tile necessary condition of each constraint: a proto-group can only respect
+# a constraint if every one of its tiles passes this predicate
+_TILE_PREDICATES = {
+    Constraint.FLUSH_BAMBOO: lambda tile: tile.is_compatible_with_half_flush(
+        Family.BAMBOO
+    ),
+    Constraint.FLUSH_CIRCLE: lambda tile: tile.is_compatible_with_half_flush(
+        Family.CIRCLE
+    ),
+    Constraint.FLUSH_CHARACTER: lambda tile: tile.is_compatible_with_half_flush(
+        Family.CHARACTER
+    ),
+    Constraint.FIRST_FOUR: lambda tile: not tile.is_honor() and tile.number <= 4,
+    Constraint.LAST_FOUR: lambda tile: not tile.is_honor() and tile.number >= 6,
+    Constraint.FIRST_THREE: lambda tile: not tile.is_honor() and tile.number <= 3,
+    Constraint.MIDDLE_THREE: lambda tile: not tile.is_honor()
+    and 4 <= tile.number <= 6,
+    Constraint.LAST_THREE: lambda tile: not tile.is_honor() and tile.number >= 7,
+    Constraint.SYMMETRIC: lambda tile: tile.is_symmetric(),
+    Constraint.FULL_TERMINALS_OR_HONORS: lambda tile: tile.is_honor()
+    or tile.is_terminal(),
+    Constraint.FULL_HONORS: lambda tile: tile.is_honor(),
+    Constraint.FULL_TERMINALS: lambda tile: tile.is_terminal(),
+    Constraint.EVEN: lambda tile: tile.is_even(),
+    Constraint.GREEN: lambda tile: tile.is_green(),
+}
+
+
+def _respects_symmetric(group: MahjongGroup) -> bool:
+    """Symmetric tiles only, and a two tiles group must be able to wait on one."""
+    if not all(tile.is_symmetric() for tile in group):
+        return False
+    waits = find_simple_waits_for_two_tiles(group)
+    return not waits or any(tile.is_symmetric() for tile in waits)
+
+
+def _all_tiles_check(predicate: Callable[[MahjongTile], bool]):
+    return lambda group: all(predicate(tile) for tile in group)
+
+
+# constraint -> check of a whole proto-group; constraints without an entry
+# (NONE, ORDINARY, ...) are respected by every group
+_GROUP_CHECKS: dict[Constraint, Callable[[MahjongGroup], bool]] = {
+    constraint: _all_tiles_check(predicate)
+    for constraint, predicate in _TILE_PREDICATES.items()
+}
+_GROUP_CHECKS[Constraint.SYMMETRIC] = _respects_symmetric
+
+# constraint -> indices of the tiles that may appear in a group respecting it
+_LEGAL_TILE_INDICES: dict[Constraint, frozenset[int]] = {
+    constraint: frozenset(
+        tile.index
+        for tile in INDEX_TO_TILE
+        if constraint not in _TILE_PREDICATES or _TILE_PREDICATES[constraint](tile)
+    )
+    for constraint in Constraint
+}
+
+
+def _get_legal_tile_indices(constraints) -> frozenset[int]:
+    """Indices of the tiles that can belong to a group respecting any constraint."""
+    legal: frozenset[int] = frozenset()
     for constraint in constraints:
-        match constraint:
-            case Constraint.NONE:
-                pass
-            case Constraint.FLUSH_BAMBOO:
-                if any(
-                    not tile.is_compatible_with_half_flush(Family.BAMBOO)
-                    for tile in group
-                ):
-                    respected_constraints.remove(Constraint.FLUSH_BAMBOO)
-            case Constraint.FLUSH_CIRCLE:
-                if any(
-                    not tile.is_compatible_with_half_flush(Family.CIRCLE)
-                    for tile in group
-                ):
-                    respected_constraints.remove(Constraint.FLUSH_CIRCLE)
-            case Constraint.FLUSH_CHARACTER:
-                if any(
-                    not tile.is_compatible_with_half_flush(Family.CHARACTER)
-                    for tile in group
-                ):
-                    respected_constraints.remove(Constraint.FLUSH_CHARACTER)
-            case Constraint.FIRST_FOUR:
-                if any(tile.number > 4 or tile.is_honor() for tile in group):
-                    respected_constraints.remove(Constraint.FIRST_FOUR)
-            case Constraint.LAST_FOUR:
-                if any(tile.number < 6 or tile.is_honor() for tile in group):
-                    respected_constraints.remove(Constraint.LAST_FOUR)
-            case Constraint.FIRST_THREE:
-                if any(tile.number > 3 or tile.is_honor() for tile in group):
-                    respected_constraints.remove(Constraint.FIRST_THREE)
-            case Constraint.MIDDLE_THREE:
-                if any(
-                    not (4 <= tile.number <= 6) or tile.is_honor() for tile in group
-                ):
-                    respected_constraints.remove(Constraint.MIDDLE_THREE)
-            case Constraint.LAST_THREE:
-                if any(tile.number < 7 or tile.is_honor() for tile in group):
-                    respected_constraints.remove(Constraint.LAST_THREE)
-            case Constraint.SYMMETRIC:
-                if (
-                    any(not tile.is_symmetric() for tile in group)
-                    or (waits := find_simple_waits_for_two_tiles(group))
-                    and all(not tile.is_symmetric() for tile in waits)
-                ):
-                    respected_constraints.remove(Constraint.SYMMETRIC)
-            case Constraint.FULL_TERMINALS_OR_HONORS:
-                if any(
-                    not tile.is_honor() and not tile.is_terminal() for tile in group
-                ):
-                    respected_constraints.remove(Constraint.FULL_TERMINALS_OR_HONORS)
-            case Constraint.FULL_HONORS:
-                if any(not tile.is_honor() for tile in group):
-                    respected_constraints.remove(Constraint.FULL_HONORS)
-            case Constraint.FULL_TERMINALS:
-                if any(not tile.is_terminal() for tile in group):
-                    respected_constraints.remove(Constraint.FULL_TERMINALS)
-            case Constraint.EVEN:
-                if any(not tile.is_even() for tile in group):
-                    respected_constraints.remove(Constraint.EVEN)
-            case Constraint.GREEN:
-                if any(not tile.is_green() for tile in group):
-                    respected_constraints.remove(Constraint.GREEN)
-    return respected_constraints
+        legal |= _LEGAL_TILE_INDICES[constraint]
+    return legal
 
 
 def find_sequences(
@@ -145,60 +165,34 @@ def find_sequences(
     :param constraints: constraints to respect
     :return: an iterator returning tuples of proto-groups and residue tiles
     """
-    for family in (Family.BAMBOO, Family.CIRCLE, Family.CHARACTER):
-        family_tiles = get_tiles_from_family(tiles, family)
-        if not family_tiles:
-            continue
-        family_tiles_num = sorted(tile.number for tile in family_tiles)
-        present = set(family_tiles_num)
-        for current_tile in family_tiles_num:
-            if current_tile > 7:
-                break
-            has_plus_one = current_tile + 1 in present
-            has_plus_two = current_tile + 2 in present
+    counts, _, _ = _prepare_counts(tiles)
+    for offset in _SEQUENCE_FAMILY_OFFSETS:
+        for base in range(offset, offset + 7):  # numbers 1..7
+            copies = counts[base]
+            if copies == 0:
+                continue
+            candidates = []
+            has_plus_one = counts[base + 1] > 0
+            has_plus_two = counts[base + 2] > 0
             if has_plus_one and has_plus_two:
-                new_group = _get_group(
-                    [current_tile, current_tile + 1, current_tile + 2], family
-                )
-                respected_constraints = _get_respected_constraints(
-                    new_group, constraints
-                )
-                if respected_constraints:
-                    yield (
-                        new_group,
-                        _get_group_residue(new_group, tiles),
-                        respected_constraints,
-                    )
+                candidates.append(_RUNS[base])
             if has_plus_one:
-                new_group = _get_group([current_tile, current_tile + 1], family)
-                respected_constraints = _get_respected_constraints(
-                    new_group, constraints
-                )
-                if respected_constraints:
-                    yield (
-                        new_group,
-                        _get_group_residue(new_group, tiles),
-                        respected_constraints,
-                    )
+                candidates.append(_ADJACENT_PARTIALS[base])
             if has_plus_two:
-                new_group = _get_group([current_tile, current_tile + 2], family)
-                respected_constraints = _get_respected_constraints(
-                    new_group, constraints
-                )
-                if respected_constraints:
-                    yield (
-                        new_group,
-                        _get_group_residue(new_group, tiles),
-                        respected_constraints,
+                candidates.append(_GAPPED_PARTIALS[base])
+            candidates.append(_SINGLES[base])
+            # the candidates are generated once per copy of the base tile
+            for _ in range(copies):
+                for indices, new_group, group_key in candidates:
+                    respected_constraints = _filter_respected_constraints(
+                        group_key, constraints
                     )
-            new_group = _get_group([current_tile], family)
-            respected_constraints = _get_respected_constraints(new_group, constraints)
-            if respected_constraints:
-                yield (
-                    new_group,
-                    _get_group_residue(new_group, tiles),
-                    respected_constraints,
-                )
+                    if respected_constraints:
+                        yield (
+                            new_group,
+                            _get_group_residue(indices, tiles),
+                            respected_constraints,
+                        )
 
 
 def find_three_of_a_kind(
@@ -210,30 +204,15 @@ def find_three_of_a_kind(
     :param constraints: constraints to respect
     :return: an iterator returning tuples of proto-groups and residue tiles
     """
-    count = Counter(tiles)
-    for current_tile, tile_count in count.items():
-        if tile_count >= 3:
-            new_group = (current_tile, current_tile, current_tile)
-            respected_constraints = _get_respected_constraints(new_group, constraints)
-            if respected_constraints:
-                yield (
-                    new_group,
-                    _get_group_residue(new_group, tiles),
-                    respected_constraints,
-                )
-        if tile_count >= 2:
-            new_group = (current_tile, current_tile)
-            respected_constraints = _get_respected_constraints(new_group, constraints)
-            if respected_constraints:
-                yield (
-                    new_group,
-                    _get_group_residue(new_group, tiles),
-                    respected_constraints,
-                )
-        new_group = (current_tile,)
-        respected_constraints = _get_respected_constraints(new_group, constraints)
+    counts, order, _ = _prepare_counts(tiles)
+    for indices, new_group, group_key in _iter_three_of_a_kind_groups(counts, order):
+        respected_constraints = _filter_respected_constraints(group_key, constraints)
         if respected_constraints:
-            yield new_group, _get_group_residue(new_group, tiles), respected_constraints
+            yield (
+                new_group,
+                _get_group_residue(indices, tiles),
+                respected_constraints,
+            )
 
 
 def find_pair(
@@ -245,26 +224,15 @@ def find_pair(
     :param constraints: constraints to respect
     :return: an iterator returning tuples of proto-groups and residue tiles
     """
-    count = Counter(tiles)
-    for current_tile, tile_count in count.items():
-        if tile_count >= 2:
-            new_group = (current_tile, current_tile)
-            respected_constraints = _get_respected_constraints(new_group, constraints)
-            if respected_constraints:
-                yield (
-                    new_group,
-                    _get_group_residue(new_group, tiles),
-                    respected_constraints,
-                )
-        else:
-            new_group = (current_tile,)
-            respected_constraints = _get_respected_constraints(new_group, constraints)
-            if respected_constraints:
-                yield (
-                    new_group,
-                    _get_group_residue(new_group, tiles),
-                    respected_constraints,
-                )
+    counts, order, _ = _prepare_counts(tiles)
+    for indices, new_group, group_key in _iter_pair_groups(counts, order):
+        respected_constraints = _filter_respected_constraints(group_key, constraints)
+        if respected_constraints:
+            yield (
+                new_group,
+                _get_group_residue(indices, tiles),
+                respected_constraints,
+            )
 
 
 def all_groups_for(
@@ -278,8 +246,8 @@ def all_groups_for(
     :param pair: number of pairs to have
     :return: list of all combinations matching the requirements, and their residue tiles
     """
-    counts, order, total = _prepare_counts(tiles)
-    raw = _recurse_none(counts, total, order, sequence, three_same, pair, set(), ())
+    counts, order, _ = _prepare_counts(tiles)
+    raw = _search_none(bytes(counts), bytes(order), sequence, three_same, pair)
     return _finalize_combinations(tiles, counts, raw)
 
 
@@ -298,8 +266,56 @@ def all_groups_for_with_constraints(
     if not constraints:
         raise AttributeError("Constraints cannot be None or empty")
     counts, order, total = _prepare_counts(tiles)
-    raw = _recurse_counts(
-        counts, total, order, sequence, three_same, pair, constraints, set(), ()
+    search_counts, search_order = _restrict_to_legal_tiles(counts, order, constraints)
+    raw = _search_counts(
+        search_counts,
+        search_order,
+        total,
+        sequence,
+        three_same,
+        pair,
+        tuple(constraints),
+    )
+    return {
+        constraint: _finalize_combinations(tiles, counts, combinations)
+        for constraint, combinations in raw.items()
+    }
+
+
+def best_groups_for(
+    tiles: MahjongTiles, groups: int, pair: int
+) -> list[MahjongCombination]:
+    """
+    Find the best combinations of groups, whatever the mix of sequences and three of a kind
+    Gives the same combinations as concatenating all_groups_for(tiles, nb_seq, groups - nb_seq, pair)
+    for nb_seq from 0 to groups, and keeping only the ones with the smallest residue
+    :param tiles: the tiles to use
+    :param groups: number of groups (sequences or three of a kind) to have
+    :param pair: number of pairs to have
+    :return: list of the best combinations, and their residue tiles
+    """
+    counts, order, _ = _prepare_counts(tiles)
+    raw = _search_best_none(bytes(counts), bytes(order), groups, pair)
+    return _finalize_combinations(tiles, counts, raw)
+
+
+def best_groups_for_with_constraints(
+    tiles: MahjongTiles, groups: int, pair: int, constraints
+) -> dict[Constraint, list[MahjongCombination]]:
+    """
+    Find the best combinations of groups for each constraint, see best_groups_for
+    :param tiles: the tiles to use
+    :param groups: number of groups (sequences or three of a kind) to have
+    :param pair: number of pairs to have
+    :param constraints: constraints to respect
+    :return: list of the best combinations of each constraint, and their residue tiles
+    """
+    if not constraints:
+        raise AttributeError("Constraints cannot be None or empty")
+    counts, order, total = _prepare_counts(tiles)
+    search_counts, search_order = _restrict_to_legal_tiles(counts, order, constraints)
+    raw = _search_best_counts(
+        search_counts, search_order, total, groups, pair, tuple(constraints)
     )
     return {
         constraint: _finalize_combinations(tiles, counts, combinations)
@@ -307,6 +323,14 @@ def all_groups_for_with_constraints(
     }
 
 
+def clear_group_cache() -> None:
+    """Empty the memoised search results (see ``_search_none``/``_search_counts``)."""
+    _search_none.cache_clear()
+    _search_counts.cache_clear()
+    _search_best_none.cache_clear()
+    _search_best_counts.cache_clear()
+
+
 def merge_group_tuple(
     group_tuple: MahjongGroups, new_group: MahjongGroup
 ) -> MahjongGroups:
@@ -321,28 +345,133 @@ def merge_group_tuple(
     return tuple(sorted_groups)
 
 
-def _encode_group_id(indices: tuple[int, ...]) -> int:
-    """Encode a proto-group (its ascending tile indices) into a unique small int.
+def _merge_group_keys(group_keys: tuple[int, ...], group_key: int) -> tuple[int, ...]:
+    """merge_group_tuple on group keys (see _build_group_keys)."""
+    sorted_keys = list(group_keys)
+    insort(sorted_keys, group_key)
+    return tuple(sorted_keys)
+
+
+def _iter_primes() -> Iterator[int]:
+    """Yield the prime numbers in increasing order."""
+    primes: list[int] = []
+    candidate = 2
+    while True:
+        if all(candidate % prime for prime in primes if prime * prime <= candidate):
+            primes.append(candidate)
+            yield candidate
+        candidate += 1
+
+
+def _is_suit_up_to(last_number: int) -> Callable[[int], bool]:
+    return lambda index: index < 27 and index % 9 + 1 <= last_number
+
+
+# every proto-group shape the enumerators produce: the tile indices of the group
+# built on a lowest tile index, and which lowest indices the shape exists for
+_GROUP_SHAPES: dict[
+    str, tuple[Callable[[int], tuple[int, ...]], Callable[[int], bool]]
+] = {
+    "single": (lambda i: (i,), lambda i: True),
+    "pair": (lambda i: (i, i), lambda i: True),
+    "triplet": (lambda i: (i, i, i), lambda i: True),
+    "run": (lambda i: (i, i + 1, i + 2), _is_suit_up_to(7)),
+    "adjacent_partial": (lambda i: (i, i + 1), _is_suit_up_to(8)),
+    "gapped_partial": (lambda i: (i, i + 2), _is_suit_up_to(7)),
+}
+
+
+def _build_group_keys() -> dict[tuple[int, ...], int]:
+    """Give every proto-group its own prime as group key.
+
+    The set of groups chosen so far is keyed by the product of their primes, which
+    unique factorisation makes an exact, order-independent multiset key updated
+    with one multiplication. Primes are handed out in increasing group order (tile
+    tuples compare like their index tuples), so sorting group keys sorts groups:
+    the search merges its combinations as sorted tuples of ints, and they are
+    turned back into tile tuples once per memoised search."""
+    all_indices = sorted(
+        {
+            indices_of(index)
+            for indices_of, is_valid in _GROUP_SHAPES.values()
+            for index in range(NB_TILE_INDICES)
+            if is_valid(index)
+        }
+    )
+    return dict(zip(all_indices, _iter_primes()))
 
-    Used as a cheap, order-independent dedup key for the set of chosen groups,
-    avoiding the cost of building/hashing tuples of tile tuples."""
-    value = 0
-    for index in indices:
-        value = value * 34 + index + 1
-    return value
 
+_GROUP_KEYS = _build_group_keys()
 
-def _insort_id(context_ids: tuple[int, ...], group_id: int) -> tuple[int, ...]:
-    """Insert a group id into a sorted tuple of ids (canonical set key)."""
-    ids = list(context_ids)
-    insort(ids, group_id)
-    return tuple(ids)
+
+def _build_candidates(shape: str) -> tuple[GroupCandidate | None, ...]:
+    """Precompute, for each lowest tile index, the candidate of one group shape."""
+    indices_of, is_valid = _GROUP_SHAPES[shape]
+    candidates: list[GroupCandidate | None] = []
+    for index in range(NB_TILE_INDICES):
+        if not is_valid(index):
+            candidates.append(None)
+            continue
+        indices = indices_of(index)
+        group = tuple(INDEX_TO_TILE[tile_index] for tile_index in indices)
+        candidates.append((indices, group, _GROUP_KEYS[indices]))
+    return tuple(candidates)
+
+
+# every proto-group the enumerators can produce, built once: the search only
+# looks them up instead of allocating index/tile tuples and encoding ids
+_SINGLES = _build_candidates("single")
+_PAIRS = _build_candidates("pair")
+_TRIPLETS = _build_candidates("triplet")
+_RUNS = _build_candidates("run")
+_ADJACENT_PARTIALS = _build_candidates("adjacent_partial")
+_GAPPED_PARTIALS = _build_candidates("gapped_partial")
+
+# group key -> tile tuple of the proto-group
+_GROUPS_BY_KEY: dict[int, MahjongGroup] = {
+    candidate[2]: candidate[1]
+    for candidates in (
+        _SINGLES,
+        _PAIRS,
+        _TRIPLETS,
+        _RUNS,
+        _ADJACENT_PARTIALS,
+        _GAPPED_PARTIALS,
+    )
+    for candidate in candidates
+    if candidate is not None
+}
+
+
+def _build_respected_constraints() -> dict[int, frozenset[Constraint]]:
+    """Map the key of every precomputed candidate to the constraints it respects."""
+    all_constraints = list(Constraint)
+    return {
+        group_key: frozenset(_get_respected_constraints(group, all_constraints))
+        for group_key, group in _GROUPS_BY_KEY.items()
+    }
+
+
+# the constrained search filters its constraints with this lookup instead of
+# evaluating the tile predicates of each constraint again at every node
+_RESPECTED_CONSTRAINTS = _build_respected_constraints()
+
+
+def _filter_respected_constraints(
+    group_key: int, constraints: list[Constraint]
+) -> list[Constraint]:
+    """_get_respected_constraints for a precomputed candidate, by table lookup."""
+    group_constraints = _RESPECTED_CONSTRAINTS[group_key]
+    return [constraint for constraint in constraints if constraint in group_constraints]
 
 
 # families ordered as in the original find_sequences (bamboo, circle, character);
 # value is the count-vector offset of number 1 for that family
 _SEQUENCE_FAMILY_OFFSETS = (18, 9, 0)
 
+# number of distinct hand states whose search results are kept
+_SEARCH_CACHE_SIZE = 8192
+
 
 def _prepare_counts(tiles: MahjongTiles) -> tuple[list[int], list[int], int]:
     """Build the count vector and the first-occurrence order of distinct tile indices."""
@@ -356,6 +485,21 @@ def _prepare_counts(tiles: MahjongTiles) -> tuple[list[int], list[int], int]:
     return counts, order, len(tiles)
 
 
+def _restrict_to_legal_tiles(
+    counts: list[int], order: list[int], constraints
+) -> tuple[bytes, bytes]:
+    """Search state of a constrained search, without the tiles no constraint allows.
+
+    Those tiles can only ever be residue: they are dropped from the search up front
+    instead of rejecting every group containing them."""
+    legal = _get_legal_tile_indices(constraints)
+    search_counts = bytes(
+        count if index in legal else 0 for index, count in enumerate(counts)
+    )
+    search_order = bytes(index for index in order if index in legal)
+    return search_counts, search_order
+
+
 def _materialize_residue(
     original_tiles: MahjongTiles, counts: list[int]
 ) -> MahjongTiles:
@@ -395,10 +539,8 @@ def _finalize_combinations(
     return result
 
 
-def _iter_sequence_groups(
-    counts: list[int],
-) -> Iterator[tuple[tuple[int, ...], MahjongGroup]]:
-    """Yield sequence-type proto-groups (3-run, partial runs, single) as (indices, group).
+def _iter_sequence_groups(counts: list[int]) -> Iterator[GroupCandidate]:
+    """Yield sequence-type proto-groups (3-run, partial runs, single).
 
     Mirrors find_sequences: families in (bamboo, circle, character) order, ascending
     numbers 1..9, yielding the full run, the two partial runs then the single tile."""
@@ -409,115 +551,286 @@ def _iter_sequence_groups(
             has_plus_one = counts[base + 1] > 0
             has_plus_two = counts[base + 2] > 0
             if has_plus_one and has_plus_two:
-                indices = (base, base + 1, base + 2)
-                yield (
-                    indices,
-                    (
-                        INDEX_TO_TILE[base],
-                        INDEX_TO_TILE[base + 1],
-                        INDEX_TO_TILE[base + 2],
-                    ),
-                )
+                yield _RUNS[base]
             if has_plus_one:
-                yield (base, base + 1), (INDEX_TO_TILE[base], INDEX_TO_TILE[base + 1])
+                yield _ADJACENT_PARTIALS[base]
             if has_plus_two:
-                yield (base, base + 2), (INDEX_TO_TILE[base], INDEX_TO_TILE[base + 2])
-            yield (base,), (INDEX_TO_TILE[base],)
+                yield _GAPPED_PARTIALS[base]
+            yield _SINGLES[base]
         base = offset + 7
         if counts[base] > 0:
-            has_plus_one = counts[base + 1] > 0
-            if has_plus_one:
-                yield (base, base + 1), (INDEX_TO_TILE[base], INDEX_TO_TILE[base + 1])
-            yield (base,), (INDEX_TO_TILE[base],)
+            if counts[base + 1] > 0:
+                yield _ADJACENT_PARTIALS[base]
+            yield _SINGLES[base]
         base = offset + 8
         if counts[base] > 0:
-            yield (base,), (INDEX_TO_TILE[base],)
+            yield _SINGLES[base]
 
 
 def _iter_three_of_a_kind_groups(
     counts: list[int], order: list[int]
-) -> Iterator[tuple[tuple[int, ...], MahjongGroup]]:
+) -> Iterator[GroupCandidate]:
     """Yield triplet/pair/single proto-groups, in first-occurrence order (like Counter)."""
     for index in order:
         count = counts[index]
         if count == 0:
             continue
-        tile = INDEX_TO_TILE[index]
         if count >= 3:
-            yield (index, index, index), (tile, tile, tile)
+            yield _TRIPLETS[index]
         if count >= 2:
-            yield (index, index), (tile, tile)
-        yield (index,), (tile,)
+            yield _PAIRS[index]
+        yield _SINGLES[index]
 
 
-def _iter_pair_groups(
-    counts: list[int], order: list[int]
-) -> Iterator[tuple[tuple[int, ...], MahjongGroup]]:
+def _iter_pair_groups(counts: list[int], order: list[int]) -> Iterator[GroupCandidate]:
     """Yield pair/single proto-groups, in first-occurrence order (like Counter)."""
     for index in order:
         count = counts[index]
         if count == 0:
             continue
-        tile = INDEX_TO_TILE[index]
         if count >= 2:
-            yield (index, index), (tile, tile)
+            yield _PAIRS[index]
         else:
-            yield (index,), (tile,)
+            yield _SINGLES[index]
+
+
+def _next_groups(
+    counts: list[int], order: bytes, sequence: int, three_same: int, pair: int
+) -> tuple[Iterator[GroupCandidate], int, int, int] | None:
+    """Proto-groups of the next group kind to pick (pairs, then sequences, then
+    three of a kind), with the group counts left once one is picked; None when
+    there is no group left to pick."""
+    if pair > 0:
+        return _iter_pair_groups(counts, order), sequence, three_same, pair - 1
+    if sequence > 0:
+        return _iter_sequence_groups(counts), sequence - 1, three_same, pair
+    if three_same > 0:
+        return (
+            _iter_three_of_a_kind_groups(counts, order),
+            sequence,
+            three_same - 1,
+            pair,
+        )
+    return None
+
+
+@lru_cache(maxsize=_SEARCH_CACHE_SIZE)
+def _search_none(
+    counts: bytes,
+    order: bytes,
+    sequence: int,
+    three_same: int,
+    pair: int,
+) -> tuple[tuple[MahjongGroups, int], ...]:
+    """Memoised unconstrained search on the canonical hand state.
+
+    The result only depends on the tile counts and the first-occurrence order of
+    the tiles (which drives the pair/triplet enumeration order), so hands that
+    share them (same free tiles across hand types, repeated simulator/rollout
+    positions) reuse the whole search.
+
+    Both are packed as bytes (one byte per count / tile index): the cache keys
+    stay small and hash in C, and iterating them still yields ints."""
+    return _groups_from_keys(
+        _recurse_none(
+            list(counts), sum(counts), order, sequence, three_same, pair, set(), 1
+        )
+    )
+
+
+@lru_cache(maxsize=_SEARCH_CACHE_SIZE)
+def _search_counts(
+    counts: bytes,
+    order: bytes,
+    total: int,
+    sequence: int,
+    three_same: int,
+    pair: int,
+    constraints: tuple[Constraint, ...],
+) -> dict[Constraint, tuple[tuple[MahjongGroups, int], ...]]:
+    """Memoised constrained search, see _search_none.
+
+    ``counts`` only holds the tiles usable by the constraints, ``total`` is the
+    full number of tiles (the residue size includes the unusable ones)."""
+    raw = _recurse_counts(
+        list(counts),
+        total,
+        order,
+        sequence,
+        three_same,
+        pair,
+        list(constraints),
+        set(),
+        1,
+    )
+    return {
+        constraint: _groups_from_keys(combinations)
+        for constraint, combinations in raw.items()
+    }
+
+
+@lru_cache(maxsize=_SEARCH_CACHE_SIZE)
+def _search_best_none(
+    counts: bytes, order: bytes, groups: int, pair: int
+) -> tuple[tuple[MahjongGroups, int], ...]:
+    """Memoised search of the best combinations over every sequence count.
+
+    The searches for each number of sequences share the count vector and the
+    smallest residue found so far, which bounds the next ones; only the smallest
+    residue combinations are kept, so the others are never turned into tiles."""
+    state = list(counts)
+    total = sum(counts)
+    searched: list[list[tuple[tuple[int, ...], int]]] = []
+    smallest_leftover = 14
+    # sequences usually leave the smallest residues: search them first for the
+    # tightest bound, results are still given in increasing number of sequences
+    for sequence in range(groups, -1, -1):
+        combinations = _recurse_none(
+            state,
+            total,
+            order,
+            sequence,
+            groups - sequence,
+            pair,
+            set(),
+            1,
+            smallest_leftover,
+        )
+        searched.append(combinations)
+        for _, residue_size in combinations:
+            smallest_leftover = min(smallest_leftover, residue_size)
+    return _groups_from_keys(
+        [
+            combination
+            for combinations in reversed(searched)
+            for combination in combinations
+            if combination[1] == smallest_leftover
+        ]
+    )
+
+
+@lru_cache(maxsize=_SEARCH_CACHE_SIZE)
+def _search_best_counts(
+    counts: bytes,
+    order: bytes,
+    total: int,
+    groups: int,
+    pair: int,
+    constraints: tuple[Constraint, ...],
+) -> dict[Constraint, tuple[tuple[MahjongGroups, int], ...]]:
+    """Memoised constrained variant of _search_best_none, see _search_counts."""
+    state = list(counts)
+    searched: list[dict[Constraint, list[tuple[tuple[int, ...], int]]]] = []
+    smallest_leftovers: dict[Constraint, int] = defaultdict(lambda: 14)
+    # see _search_best_none for the search order
+    for sequence in range(groups, -1, -1):
+        raw = _recurse_counts(
+            state,
+            total,
+            order,
+            sequence,
+            groups - sequence,
+            pair,
+            list(constraints),
+            set(),
+            1,
+            max(smallest_leftovers[constraint] for constraint in constraints),
+        )
+        searched.append(raw)
+        for constraint, combinations in raw.items():
+            for _, residue_size in combinations:
+                smallest_leftovers[constraint] = min(
+                    smallest_leftovers[constraint], residue_size
+                )
+    best_combinations: dict[Constraint, list[tuple[tuple[int, ...], int]]] = (
+        defaultdict(list)
+    )
+    for raw in reversed(searched):
+        for constraint, combinations in raw.items():
+            best_combinations[constraint] += [
+                combination
+                for combination in combinations
+                if combination[1] == smallest_leftovers[constraint]
+            ]
+    return {
+        constraint: _groups_from_keys(combinations)
+        for constraint, combinations in best_combinations.items()
+    }
+
+
+def _groups_from_keys(
+    combinations: list[tuple[tuple[int, ...], int]]
+) -> tuple[tuple[MahjongGroups, int], ...]:
+    """Turn the group keys of searched combinations back into tile tuples."""
+    return tuple(
+        (tuple(_GROUPS_BY_KEY[group_key] for group_key in group_keys), residue_size)
+        for group_keys, residue_size in combinations
+    )
 
 
 def _recurse_none(
     counts: list[int],
     total: int,
-    order: list[int],
+    order: bytes,
     sequence: int,
     three_same: int,
     pair: int,
     cache: set,
-    context_ids: tuple[int, ...],
-) -> list[tuple[MahjongGroups, int]]:
+    context_key: int,
+    bound: int = 14,
+) -> list[tuple[tuple[int, ...], int]]:
     """Unconstrained variant of _recurse_counts.
 
     Since the only constraint is Constraint.NONE (always respected), this skips the
     per-group constraint check and the constraint-keyed dictionaries entirely, which
     is the bulk of the workload (all pungs, seven pairs, chow patterns...).
 
-    Combinations carry the residue *size* only; the residue tile list is rebuilt
-    later by _finalize_combinations for the kept results."""
+    Combinations carry sorted group keys and the residue *size* only; the group
+    tuples and the residue tile list are rebuilt later for the kept results.
+
+    ``bound`` is the largest residue size an ancestor can still keep: subtrees
+    that cannot get under it are skipped (branch and bound).
+
+    The last level of the search is scanned by _expand_last_level rather than
+    through a recursive call: it is the most frequent call by far, and only
+    returns the leaves its parent would keep anyway."""
     needed_tiles = 3 * (sequence + three_same) + 2 * pair
     if total < needed_tiles - 1:
         raise AttributeError(
             f"Not enough tiles, need at least {needed_tiles - 1} tiles"
         )
 
-    if pair > 0:
-        iterator = _iter_pair_groups(counts, order)
-        new_sequence, new_three_same, new_pair = sequence, three_same, pair - 1
-    elif sequence > 0:
-        iterator = _iter_sequence_groups(counts)
-        new_sequence, new_three_same, new_pair = sequence - 1, three_same, pair
-    elif three_same > 0:
-        iterator = _iter_three_of_a_kind_groups(counts, order)
-        new_sequence, new_three_same, new_pair = sequence, three_same - 1, pair
-    else:
+    next_groups = _next_groups(counts, order, sequence, three_same, pair)
+    if next_groups is None:
         return []
+    iterator, new_sequence, new_three_same, new_pair = next_groups
 
     is_leaf = new_sequence == 0 and new_three_same == 0 and new_pair == 0
-    combinations: list[tuple[MahjongGroups, int]] = []
+    # the most tiles the remaining groups can hold once the next group is chosen
+    capacity = 3 * (new_sequence + new_three_same) + 2 * new_pair
+    combinations: list[tuple[tuple[int, ...], int]] = []
     smallest_leftover = 14
+    # the child would be a leaf: expand it in this loop instead of recursing
+    is_last_level = new_sequence + new_three_same + new_pair == 1
 
-    for indices, found_group in iterator:
-        new_ids = _insort_id(context_ids, _encode_group_id(indices))
-        if new_ids in cache:
+    for indices, _, group_key in iterator:
+        # the residue can't get under this, whatever the remaining groups are
+        if total - len(indices) - capacity > min(bound, smallest_leftover):
             continue
-        cache.add(new_ids)
+        new_key = context_key * group_key
+        if new_key in cache:
+            continue
+        cache.add(new_key)
 
         for index in indices:
             counts[index] -= 1
 
         if is_leaf:
-            combinations.append(((found_group,), total - len(indices)))
+            combinations.append(((group_key,), total - len(indices)))
         else:
-            child = _recurse_none(
+            # the last level is scanned without recursing, see the docstring
+            search = _expand_last_level if is_last_level else _recurse_none
+            child = search(
                 counts,
                 total - len(indices),
                 order,
@@ -525,16 +838,17 @@ def _recurse_none(
                 new_three_same,
                 new_pair,
                 cache,
-                new_ids,
+                new_key,
+                min(bound, smallest_leftover),
             )
-            for best_group, residue_size in child:
+            for best_keys, residue_size in child:
                 if residue_size > smallest_leftover:
                     continue
                 if residue_size < smallest_leftover:
                     combinations.clear()
                     smallest_leftover = residue_size
                 combinations.append(
-                    (merge_group_tuple(best_group, found_group), residue_size)
+                    (_merge_group_keys(best_keys, group_key), residue_size)
                 )
 
         for index in indices:
@@ -543,17 +857,52 @@ def _recurse_none(
     return combinations
 
 
+def _expand_last_level(
+    counts: list[int],
+    total: int,
+    order: bytes,
+    sequence: int,
+    three_same: int,
+    pair: int,
+    cache: set,
+    context_key: int,
+    bound: int,
+) -> list[tuple[tuple[int, ...], int]]:
+    """Leaves of the single group left to pick, for _recurse_none.
+
+    Unlike a recursive call, the bound tightens as smaller residues are found,
+    and only the leaves with the smallest residue are returned."""
+    leaves: list[tuple[tuple[int, ...], int]] = []
+    next_groups = _next_groups(counts, order, sequence, three_same, pair)
+    if next_groups is None:
+        return leaves
+    for indices, _, group_key in next_groups[0]:
+        residue_size = total - len(indices)
+        if residue_size > bound:
+            continue
+        new_key = context_key * group_key
+        if new_key in cache:
+            continue
+        cache.add(new_key)
+        if residue_size < bound:
+            leaves.clear()
+            bound = residue_size
+        leaves.append(((group_key,), residue_size))
+    return leaves
+
+
 def _recurse_counts(
     counts: list[int],
     total: int,
-    order: list[int],
+    order: bytes,
     sequence: int,
     three_same: int,
     pair: int,
     constraints,
     cache: set,
-    context_ids: tuple[int, ...],
-) -> dict[Constraint, list[tuple[MahjongGroups, int]]]:
+    context_key: int,
+    bound: int = 14,
+) -> dict[Constraint, list[tuple[tuple[int, ...], int]]]:
     needed_tiles = 3 * (sequence + three_same) + 2 * pair
     if total < needed_tiles - 1:
         raise AttributeError(
@@ -561,32 +910,35 @@ def _recurse_counts(
         )
 
     # pick the next group kind to expand, matching the original priority order
-    if pair > 0:
-        iterator = _iter_pair_groups(counts, order)
-        new_sequence, new_three_same, new_pair = sequence, three_same, pair - 1
-    elif sequence > 0:
-        iterator = _iter_sequence_groups(counts)
-        new_sequence, new_three_same, new_pair = sequence - 1, three_same, pair
-    elif three_same > 0:
-        iterator = _iter_three_of_a_kind_groups(counts, order)
-        new_sequence, new_three_same, new_pair = sequence, three_same - 1, pair
-    else:
+    next_groups = _next_groups(counts, order, sequence, three_same, pair)
+    if next_groups is None:
         return {}
+    iterator, new_sequence, new_three_same, new_pair = next_groups
 
     is_leaf = new_sequence == 0 and new_three_same == 0 and new_pair == 0
-    possible_combinations: dict[Constraint, list[tuple[MahjongGroups, int]]] = (
+    capacity = 3 * (new_sequence + new_three_same) + 2 * new_pair
+    possible_combinations: dict[Constraint, list[tuple[tuple[int, ...], int]]] = (
         defaultdict(list)
     )
     smallest_leftovers: dict[Constraint, int] = defaultdict(lambda: 14)
-
-    for indices, found_group in iterator:
-        respected_constraints = _get_respected_constraints(found_group, constraints)
+    # largest threshold over the constraints: a subtree that can't get under it
+    # is useless for all of them (see _recurse_none for the bound)
+    loosest_leftover = 14
+
+    for indices, _, group_key in iterator:
+        group_constraints = _RESPECTED_CONSTRAINTS[group_key]
+        respected_constraints = [
+            constraint for constraint in constraints if constraint in group_constraints
+        ]
         if not respected_constraints:
             continue
-        new_ids = _insort_id(context_ids, _encode_group_id(indices))
-        if new_ids in cache:
+        child_bound = min(bound, loosest_leftover)
+        if total - len(indices) - capacity > child_bound:
+            continue
+        new_key = context_key * group_key
+        if new_key in cache:
             continue
-        cache.add(new_ids)
+        cache.add(new_key)
 
         for index in indices:
             counts[index] -= 1
@@ -594,7 +946,7 @@ def _recurse_counts(
         if is_leaf:
             residue_size = total - len(indices)
             for constraint in respected_constraints:
-                possible_combinations[constraint].append(((found_group,), residue_size))
+                possible_combinations[constraint].append(((group_key,), residue_size))
         else:
             child = _recurse_counts(
                 counts,
@@ -605,17 +957,21 @@ def _recurse_counts(
                 new_pair,
                 respected_constraints,
                 cache,
-                new_ids,
+                new_key,
+                child_bound,
             )
             for constraint, combinations in child.items():
-                for best_group, residue_size in combinations:
+                for best_keys, residue_size in combinations:
                     if residue_size > smallest_leftovers[constraint]:
                         continue
                     if residue_size < smallest_leftovers[constraint]:
                         possible_combinations[constraint].clear()
                         smallest_leftovers[constraint] = residue_size
+                        loosest_leftover = max(
+                            smallest_leftovers[other] for other in constraints
+                        )
                     possible_combinations[constraint].append(
-                        (merge_group_tuple(best_group, found_group), residue_size)
+                        (_merge_group_keys(best_keys, group_key), residue_size)
                     )
 
         for index in indices:
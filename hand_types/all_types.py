@@ -2,7 +2,7 @@ from itertools import chain
 
 from acceptance import get_full_tile_acceptance
 from group_finder import find_sequences, find_three_of_a_kind, merge_group_tuple
-from mahjong_objects import MahjongHand, Family, Constraint, get_tiles_from_family
+from mahjong_objects import MahjongHand, Family, Constraint, get_tiles_by_family
 from tiles_utils import FAMILY_TILES, WINDS_TILES, DRAGONS_TILES
 
 
@@ -15,6 +15,8 @@ def can_construct_all_types(hand: MahjongHand):
     concatenated_results = []
     have_family = [False] * 5
     declared_groups = hand.get_all_declared_groups()
+    free_tiles = hand.get_free_tiles()
+    free_tiles_by_family = get_tiles_by_family(free_tiles)
     tile_check = [
         lambda t: t.family == Family.CIRCLE,
         lambda t: t.family == Family.CHARACTER,
@@ -33,7 +35,7 @@ def can_construct_all_types(hand: MahjongHand):
                     return [], set()
                 compatible_group = group
                 have_family[family_index] = True
-                useless_tiles.update([tile for tile in hand.get_free_tiles() if tile_check[family_index](tile)])
+                useless_tiles.update([tile for tile in free_tiles if tile_check[family_index](tile)])
                 groups.append(compatible_group)
 
     if groups:
@@ -43,12 +45,12 @@ def can_construct_all_types(hand: MahjongHand):
         if have_family[family_index]:
             continue
         concatenated_results = _find_groups_and_concatenate(
-            get_tiles_from_family(hand.get_free_tiles(), family),
+            free_tiles_by_family[family],
             concatenated_results,
             FAMILY_TILES[family],
         )
 
-    tiles = get_tiles_from_family(hand.get_free_tiles(), Family.HONOR)
+    tiles = free_tiles_by_family[Family.HONOR]
     if not have_family[3]:
         concatenated_results = _find_groups_and_concatenate(
             [tile for tile in tiles if tile.is_wind()],
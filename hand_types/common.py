@@ -1,15 +1,62 @@
-from group_finder import all_groups_for
-from mahjong_objects import MahjongTiles, MahjongCombination, MahjongGroups, MahjongGroup
+from collections import Counter
+from functools import cache
+from typing import Iterable
+
+from group_finder import all_groups_for, best_groups_for
+from mahjong_objects import MahjongTiles, MahjongCombination, MahjongGroups, MahjongGroup, MahjongTile
+from pattern_generator import pattern_generator
+from tiles_utils import parse_tiles
+
+
+ParsedThreeGroupPattern = tuple[tuple[MahjongTile, ...], tuple[MahjongGroup, MahjongGroup, MahjongGroup]]
+
+
+def parse_three_group_pattern(pattern: str) -> ParsedThreeGroupPattern:
+    """Parse a strict nine tiles pattern, and split it in its three groups
+
+    :param pattern: strict pattern, as generated by pattern_generator
+    :return: the pattern tiles, and its three groups of three tiles
+    """
+    tiles = tuple(parse_tiles(pattern))
+    return tiles, (tiles[:3], tiles[3:6], tiles[6:])
+
+
+@cache
+def parsed_three_group_patterns(input_pattern: str) -> tuple[ParsedThreeGroupPattern, ...]:
+    """All strict patterns of a wildcard pattern, expanded and parsed once
+
+    Patterns made of the same three groups in another order (e.g. 123m123p123s
+    and 123p123m123s for ABCaABCbABCc) lead to the exact same search, so only
+    the first one is kept.
+
+    :param input_pattern: wildcard pattern, see pattern_generator for the format
+    :return: the parsed strict patterns, in pattern_generator order
+    """
+    parsed_patterns: list[ParsedThreeGroupPattern] = []
+    seen: set[tuple[MahjongGroup, ...]] = set()
+    for pattern in pattern_generator(input_pattern):
+        parsed = parse_three_group_pattern(pattern)
+        key = tuple(sorted(parsed[1], key=lambda group: [tile.index for tile in group]))
+        if key in seen:
+            continue
+        seen.add(key)
+        parsed_patterns.append(parsed)
+    return tuple(parsed_patterns)
 
 
 def _get_best_groups(
         best_groups: list[MahjongCombination],
 ) -> tuple[int, list[MahjongCombination]]:
-    real_shanten = min(len(residue) for _, residue in best_groups)
+    real_shanten = 14
     groups_to_return: list[MahjongCombination] = []
     for best_group, residue in best_groups:
-        if len(residue) == real_shanten:
-            groups_to_return.append((best_group, residue))
+        residue_length = len(residue)
+        if residue_length > real_shanten:
+            continue
+        if residue_length < real_shanten:
+            real_shanten = residue_length
+            groups_to_return.clear()
+        groups_to_return.append((best_group, residue))
     return real_shanten, groups_to_return
 
 def _can_construct_one_pair(
@@ -30,9 +77,7 @@ def can_construct_one_pair(
 def _can_construct_one_group_one_pair(
         tiles: MahjongTiles,
 ) -> tuple[int, list[MahjongCombination]]:
-    best_groups: list[MahjongCombination] = all_groups_for(tiles, 0, 1, 1)
-    best_groups += all_groups_for(tiles, 1, 0, 1)
-    return _get_best_groups(best_groups)
+    return _get_best_groups(best_groups_for(tiles, 1, 1))
 
 
 def can_construct_one_group_one_pair(
@@ -54,13 +99,25 @@ def _get_read_groups_from_full_groups(
         hand_tiles: MahjongTiles, groups: MahjongGroups
 ) -> list[MahjongGroup]:
     result: list[MahjongGroup] = []
-    tiles_left = list(hand_tiles)
+    tiles_left = Counter(hand_tiles)
     for group in groups:
         new_group = []
         for tile in group:
-            if tile in tiles_left:
-                tiles_left.remove(tile)
+            if tiles_left[tile]:
+                tiles_left[tile] -= 1
                 new_group.append(tile)
         result.append(tuple(new_group))
     return result
 
+
+def remove_tiles(tiles: Iterable[MahjongTile], to_remove: Iterable[MahjongTile]) -> MahjongTiles:
+    """Remove one occurrence of each tile of to_remove from tiles, keeping the order of the remaining tiles"""
+    left_to_remove = Counter(to_remove)
+    result: MahjongTiles = []
+    for tile in tiles:
+        if left_to_remove[tile]:
+            left_to_remove[tile] -= 1
+        else:
+            result.append(tile)
+    return result
+
@@ -1,11 +1,16 @@
 from typing import Iterable
 
 from acceptance import get_tile_acceptance_of_groups
-from hand_types.common import can_construct_one_group_one_pair, can_construct_one_pair, get_read_groups_from_combi_tiles
+from hand_types.common import (
+    can_construct_one_group_one_pair,
+    can_construct_one_pair,
+    get_read_groups_from_combi_tiles,
+    parsed_three_group_patterns,
+    remove_tiles,
+)
 from mahjong_objects import MahjongHand, MahjongCombination, MahjongTile, MahjongGroup, MahjongTiles, Family, \
     get_tiles_from_family
-from pattern_generator import pattern_generator
-from tiles_utils import parse_tiles, HONOR_TILES
+from tiles_utils import HONOR_TILES
 
 
 def can_construct_knitted(
@@ -28,30 +33,24 @@ def can_construct_knitted(
         # impossible to build knitted
         return [], set()
 
-    for pattern in pattern_generator("147a258b369c"):
-        orig_combi = parse_tiles(pattern)
-        orig_combi_groups = (
-            tuple(orig_combi[:3]),
-            tuple(orig_combi[3:6]),
-            tuple(orig_combi[6:]),
-        )
-        combi = list(orig_combi)
-        missing, tiles = hand.get_missing_tiles_and_residue(combi)
-        for tile in missing:
-            combi.remove(tile)
+    for orig_combi, orig_combi_groups in parsed_three_group_patterns("147a258b369c"):
+        missing, tiles = hand.get_missing_tiles_and_residue(orig_combi)
+        combi = remove_tiles(orig_combi, missing)
         if not declared_groups:
             # can build knitted with honors
             usable_honor_tiles = set(get_tiles_from_family(tiles, Family.HONOR))
-            leftover = list(tiles)
-            for tile in usable_honor_tiles:
-                leftover.remove(tile)
+            leftover = remove_tiles(tiles, usable_honor_tiles)
             shanten = len(leftover)
             if shanten < best_shanten:
                 best_shanten = shanten
                 best_combi = get_read_groups_from_combi_tiles(combi, orig_combi_groups)
                 best_result = [((tuple(usable_honor_tiles),), leftover)]
                 best_acceptance = missing + list(set(HONOR_TILES) - set(usable_honor_tiles))
-            # and also knitted straight
+            # and also knitted straight, unless its leftover group and pair
+            # (5 tiles at most) can't beat the best so far (see
+            # can_construct_with_3_group_pattern for the closed hand condition)
+            if len(tiles) - 5 >= best_shanten:
+                continue
             shanten, result = can_construct_one_group_one_pair(tiles, cache)
             if shanten < best_shanten:
                 best_shanten = shanten
@@ -1,9 +1,15 @@
 from acceptance import get_full_tile_acceptance
-from group_finder import all_groups_for_with_constraints
+from group_finder import best_groups_for_with_constraints
 from mahjong_objects import Constraint, MahjongCombination, Family, MahjongHand, MahjongTile
 from tiles_utils import FAMILY_TILES, HONOR_TILES, FIRST_FOUR_TILES, LAST_FOUR_TILES, SYMMETRIC_TILES
 
 
+# allowed tiles of a half flush, by family
+_HALF_FLUSH_TILES = {
+    family: tiles + HONOR_TILES for family, tiles in FAMILY_TILES.items()
+}
+
+
 def precompute_constraints(hand):
     constraints = [
         Constraint.FLUSH_CHARACTER,
@@ -36,19 +42,18 @@ def precompute_constraints(hand):
             incompatible_constraints.add(Constraint.FLUSH_CHARACTER)
     constraints = [c for c in constraints if c not in incompatible_constraints]
     if constraints:
-        for nb_seq in range(free_groups + 1):
-            for constraint, combinations in all_groups_for_with_constraints(
-                    hand.get_free_tiles(), nb_seq, free_groups - nb_seq, 1, constraints
-            ).items():
-                extended_combinations = []
-                for combination in combinations:
-                    extended_combinations.append(
-                        (
-                            tuple(list(combination[0]) + list(declared_groups)),
-                            combination[1],
-                        )
+        for constraint, combinations in best_groups_for_with_constraints(
+                hand.get_free_tiles(), free_groups, 1, constraints
+        ).items():
+            extended_combinations = []
+            for combination in combinations:
+                extended_combinations.append(
+                    (
+                        tuple(list(combination[0]) + list(declared_groups)),
+                        combination[1],
                     )
-                best_combinations[constraint] += extended_combinations
+                )
+            best_combinations[constraint] += extended_combinations
     return dict(best_combinations)
 
 
@@ -65,31 +70,22 @@ def can_construct_half_flush_from_precomputed(
 
     family = _find_example_tile(best_groups[0]).family
     return best_groups, get_full_tile_acceptance(
-        hand.hand_tiles, best_groups, allowed_tiles=FAMILY_TILES[family] + HONOR_TILES
+        hand.hand_tiles, best_groups, allowed_tiles=_HALF_FLUSH_TILES[family]
     )
 
 
 def _get_best_groups_from_multiple_constraints(constraints, precomputed):
-    best_combinations = {
-        constraint: precomputed[constraint] for constraint in constraints
-    }
-
     best_groups = []
     best_shanten = 14
-    for _, combinations in best_combinations.items():
-        if not combinations:
-            continue
-        real_shanten = min(len(residue) for _, residue in combinations)
-        if real_shanten > best_shanten:
-            continue
-        if real_shanten < best_shanten:
-            best_groups.clear()
-            best_shanten = real_shanten
-        best_groups += [
-            (groups, residue)
-            for groups, residue in combinations
-            if len(residue) == best_shanten
-        ]
+    for constraint in constraints:
+        for groups, residue in precomputed[constraint]:
+            residue_length = len(residue)
+            if residue_length > best_shanten:
+                continue
+            if residue_length < best_shanten:
+                best_groups.clear()
+                best_shanten = residue_length
+            best_groups.append((groups, residue))
     return best_groups
 
 
@@ -102,11 +98,12 @@ def _find_example_tile(combination: MahjongCombination) -> MahjongTile:
 
 
 def _get_first_last_tile_acceptance(hand, best_groups):
-    if _find_example_tile(best_groups[0]) in FIRST_FOUR_TILES:
+    example_tile = _find_example_tile(best_groups[0])
+    if example_tile in FIRST_FOUR_TILES:
         return get_full_tile_acceptance(
             hand.hand_tiles, best_groups, allowed_tiles=FIRST_FOUR_TILES
         )
-    if _find_example_tile(best_groups[0]) in LAST_FOUR_TILES:
+    if example_tile in LAST_FOUR_TILES:
         return get_full_tile_acceptance(
             hand.hand_tiles, best_groups, allowed_tiles=LAST_FOUR_TILES
         )
@@ -3,6 +3,8 @@ from hand_types.common import (
     get_read_groups_from_combi_tiles,
     can_construct_one_group_one_pair,
     can_construct_one_pair,
+    parsed_three_group_patterns,
+    remove_tiles,
 )
 from mahjong_objects import (
     MahjongHand,
@@ -11,8 +13,6 @@ from mahjong_objects import (
     MahjongGroup,
     MahjongTiles,
 )
-from pattern_generator import pattern_generator
-from tiles_utils import parse_tiles
 
 
 def can_construct_with_3_group_pattern(
@@ -30,36 +30,42 @@ def can_construct_with_3_group_pattern(
     best_combi: list[MahjongGroup] = []
     best_acceptance: MahjongTiles = []
 
-    for pattern in pattern_generator(input_pattern):
-        orig_combi = parse_tiles(pattern)
-        orig_combi_groups = (
-            tuple(orig_combi[:3]),
-            tuple(orig_combi[3:6]),
-            tuple(orig_combi[6:]),
-        )
-        other_declared_groups = set(hand.get_all_declared_groups()).difference(
+    declared_groups = hand.get_all_declared_groups()
+    for orig_combi, orig_combi_groups in parsed_three_group_patterns(input_pattern):
+        other_declared_groups = set(declared_groups).difference(
             set(orig_combi_groups)
         )
         if len(other_declared_groups) > 1:
             # combi impossible
             continue
-        combi = list(orig_combi)
-        to_search = list(orig_combi)
-        for original_group in orig_combi_groups:
-            if original_group in hand.get_all_declared_groups():
-                for tile in original_group:
-                    to_search.remove(tile)
+        to_search = orig_combi
+        if declared_groups:
+            to_search = remove_tiles(
+                orig_combi,
+                [
+                    tile
+                    for original_group in orig_combi_groups
+                    if original_group in declared_groups
+                    for tile in original_group
+                ],
+            )
         missing, tiles = hand.get_missing_tiles_and_residue(to_search)
-        for tile in missing:
-            combi.remove(tile)
+        # the leftover group and pair hold at most 5 tiles: skip the search when
+        # even that can't beat the best pattern so far. Only done for closed hands:
+        # the leftover cache is keyed by tiles only and shared with the pair-only
+        # search, so with declared groups skipping a search could change which one
+        # fills a key first
+        if not declared_groups and len(tiles) - 5 >= best_shanten:
+            continue
         if len(other_declared_groups) == 1:
             shanten, result = can_construct_one_pair(tiles, cache)
         else:
             shanten, result = can_construct_one_group_one_pair(tiles, cache)
         if shanten < best_shanten:
             best_shanten = shanten
+            # the pattern tiles found in hand are only needed for the best pattern
             best_combi = get_read_groups_from_combi_tiles(
-                combi, orig_combi_groups
+                remove_tiles(orig_combi, missing), orig_combi_groups
             ) + list(other_declared_groups)
             best_result = result
             best_acceptance = missing
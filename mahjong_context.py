@@ -5,7 +5,7 @@ from dataclasses import dataclass, field
 
 from mahjong_core import MahjongTile, MahjongGroup, Family
 
-@dataclass
+@dataclass(slots=True)
 class HandContext:
     """
     Mahjong hand precomputed context for yaku analysis
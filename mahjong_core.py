@@ -210,9 +210,8 @@ class MahjongTile:
         """
         return self._is_ordinary
 
-    def __eq__(self, other):
-        # tiles are interned, so identity is equivalent to equality
-        return self is other
+    # no __eq__: tiles are interned, so the default identity comparison (done in
+    # C, without a Python call) is equivalent to equality
 
     def __hash__(self):
         return self._hash
@@ -247,6 +246,8 @@ class MahjongGroupInstance:
     represent a mahjong proto-group
     """
 
+    __slots__ = ("group", "possible_full_groups")
+
     def __init__(self, group: tuple):
         self.group = group
         self.possible_full_groups: dict[Constraint, list[MahjongGroup]] = {}
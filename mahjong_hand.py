@@ -1,7 +1,7 @@
 """
 MahjongHand and related utilities
 """
-from collections import defaultdict
+from collections import Counter, defaultdict
 from typing import Iterable
 
 from mahjong_core import MahjongTile, MahjongTiles, MahjongGroup, Family
@@ -11,6 +11,8 @@ class MahjongHand:
     mahjong hand
     """
 
+    __slots__ = ("hand_tiles", "drawn_tile", "declared_tiles", "kongs")
+
     def __init__(self, hand_tiles: MahjongTiles, drawn_tile: MahjongTile | None = None):
         self.hand_tiles: MahjongTiles = hand_tiles
         self.drawn_tile: MahjongTile | None = drawn_tile
@@ -55,13 +57,23 @@ class MahjongHand:
         :return: the missing tiles in the hand for given tiles, and the residue
         """
         current_hand = self.get_free_tiles()
+        available = Counter(current_hand)
+        found = Counter()
         not_found = []
         for tile in tiles:
-            if tile in current_hand:
-                current_hand.remove(tile)
+            if available[tile]:
+                available[tile] -= 1
+                found[tile] += 1
             else:
                 not_found.append(tile)
-        return not_found, current_hand
+        # found tiles are taken from their first occurrences in the hand
+        residue = []
+        for tile in current_hand:
+            if found[tile]:
+                found[tile] -= 1
+            else:
+                residue.append(tile)
+        return not_found, residue
 
     def draw(self, draw_tile: MahjongTile):
         """
@@ -96,10 +108,9 @@ class MahjongHand:
             if group in self.declared_tiles:
                 continue
             groups_by_family[group[0].family].append('[' + "".join(str(t.number) for t in group) + ']')
+        free_tiles_by_family = get_tiles_by_family(self.get_free_tiles())
         for family in Family:
-            tiles: list[int] = [
-                tile.number for tile in get_tiles_from_family(self.get_free_tiles(), family)
-            ]
+            tiles: list[int] = [tile.number for tile in free_tiles_by_family[family]]
             declared = groups_by_family[family]
             if declared:
                 rep += "".join(sorted(declared))
@@ -120,8 +131,16 @@ def get_tiles_from_family(tiles: MahjongTiles, family: Family):
     :param family: family
     :return: the tiles matching given family
     """
-    found: MahjongTiles = []
+    return [tile for tile in tiles if tile.family is family]
+
+
+def get_tiles_by_family(tiles: MahjongTiles) -> dict[Family, MahjongTiles]:
+    """
+    split given tiles by family in a single pass
+    :param tiles: tiles to split
+    :return: the tiles of each family (every family is present), in their original order
+    """
+    found: dict[Family, MahjongTiles] = {family: [] for family in Family}
     for tile in tiles:
-        if tile.family == family:
-            found.append(tile)
+        found[tile.family].append(tile)
     return found
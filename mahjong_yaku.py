@@ -2,7 +2,7 @@ from collections import Counter
 from enum import Enum
 from itertools import combinations, permutations
 
-from mahjong_core import MahjongGroup, Family
+from mahjong_core import MahjongGroup, Family, NB_TILE_INDICES
 from mahjong_context import (
     HandContext,
     concealed_pungs,
@@ -486,9 +486,15 @@ def _check_all_chows(h: HandContext) -> bool:
 
 def _check_tile_hog(h: HandContext) -> int:
     """Count tiles with 4 copies used without declaring a kong."""
-    kong_tiles = {g[0] for g in h.kongs}
-    c = Counter(h.all_tiles)
-    return sum(1 for tile, v in c.items() if v == 4 and tile not in kong_tiles)
+    counts = [0] * NB_TILE_INDICES
+    for tile in h.all_tiles:
+        index = tile.index
+        # simple-wait inference can produce out-of-range honors (8z/9z) as
+        # added tiles; they appear at most once so they can never be a hog
+        if index < NB_TILE_INDICES:
+            counts[index] += 1
+    declared = sum(1 for index in {g[0].index for g in h.kongs} if counts[index] == 4)
+    return counts.count(4) - declared
 
 
 def _check_double_pungs(h: HandContext) -> bool:
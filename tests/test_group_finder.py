@@ -0,0 +1,64 @@
+"""Regression tests for the constraint handling of group_finder.
+
+The constrained search filters proto-groups through per-constraint tile
+predicates precomputed at import time; a predicate wired to the wrong family
+would silently poison every memoised constrained search.
+"""
+
+import pytest
+
+from group_finder import (
+    all_groups_for,
+    all_groups_for_with_constraints,
+    best_groups_for,
+    find_sequences,
+)
+from mahjong_objects import Constraint, Family
+from tiles_utils import parse_tiles
+
+_FLUSH_FAMILIES = {
+    Constraint.FLUSH_BAMBOO: Family.BAMBOO,
+    Constraint.FLUSH_CIRCLE: Family.CIRCLE,
+    Constraint.FLUSH_CHARACTER: Family.CHARACTER,
+}
+
+
+@pytest.mark.parametrize("constraint", list(_FLUSH_FAMILIES))
+def test_find_sequences_flush_constraint_keeps_its_family(constraint):
+    family = _FLUSH_FAMILIES[constraint]
+    tiles = parse_tiles("123m123p123s1z")
+    groups = [group for group, _, _ in find_sequences(tiles, [constraint])]
+    assert groups
+    assert all(
+        tile.family in (family, Family.HONOR) for group in groups for tile in group
+    )
+    assert any(group[0].family == family and len(group) == 3 for group in groups)
+
+
+def test_flush_character_search_uses_character_groups():
+    tiles = parse_tiles("123456789m123s11z")
+    results = all_groups_for_with_constraints(
+        tiles, 4, 0, 1, [Constraint.FLUSH_CHARACTER]
+    )[Constraint.FLUSH_CHARACTER]
+    assert results
+    for groups, residue in results:
+        assert all(
+            tile.is_compatible_with_half_flush(Family.CHARACTER)
+            for group in groups
+            for tile in group
+        )
+        assert sorted(residue) == parse_tiles("123s")
+
+
+@pytest.mark.parametrize("hand", ["123m456p789s1123z", "11123m557p99s344z", "1369m2578p468s123z"])
+def test_best_groups_for_matches_every_sequence_count(hand):
+    tiles = parse_tiles(hand)
+    combinations = []
+    for nb_seq in range(5):
+        combinations += all_groups_for(tiles, nb_seq, 4 - nb_seq, 1)
+    smallest = min(len(residue) for _, residue in combinations)
+    assert best_groups_for(tiles, 4, 1) == [
+        (groups, residue)
+        for groups, residue in combinations
+        if len(residue) == smallest
+    ]
@@ -17,8 +17,13 @@ import pytest
 
 from mahjong_objects import MahjongHand
 from tests.snapshot_util import SNAPSHOT_HANDS, snapshot_for_hand
-from tile_acceptance_calculator import analyze_hand, get_tile_to_discard_from
-from tiles_utils import parse_hand
+from tile_acceptance_calculator import (
+    HandType,
+    analyze_hand,
+    clear_analyze_cache,
+    get_tile_to_discard_from,
+)
+from tiles_utils import parse_hand, parse_tiles
 
 _GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "golden_acceptance.json")
 
@@ -46,3 +51,28 @@ def test_get_tile_to_discard_rejects_non_discardable_hand():
     assert not hand.needs_to_discard()
     with pytest.raises(AttributeError):
         get_tile_to_discard_from(hand)
+
+
+def test_hand_type_subset_analysis_does_not_change_full_analysis():
+    # the leftover cache of the pattern hand types is shared by tiles only, so a
+    # hand type analysed alone may differ from the same hand type in a full run
+    hand = parse_hand("(345)m6m138p1899s36z")
+    clear_analyze_cache()
+    expected = analyze_hand(hand, use_cache=False)
+    analyze_hand(hand, hand_types=[HandType.PURE_SHIFTED])
+    assert analyze_hand(hand) == expected
+
+
+def test_reordered_hand_analysis_under_other_winds_is_not_reused():
+    # residues and combination order follow the hand tile order, so an analysis
+    # of the same tiles in another order must not be served from the cache
+    tiles = parse_tiles("4677s137m1379p245z")
+    hand = MahjongHand(list(tiles))
+    reordered = MahjongHand(list(reversed(tiles)))
+    clear_analyze_cache()
+    expected = analyze_hand(hand, prevalent_wind=1, seat_wind=1, use_cache=False)
+    expected_reordered = analyze_hand(
+        reordered, prevalent_wind=2, seat_wind=3, use_cache=False
+    )
+    assert analyze_hand(reordered, prevalent_wind=2, seat_wind=3) == expected_reordered
+    assert analyze_hand(hand, prevalent_wind=1, seat_wind=1) == expected
@@ -2,11 +2,12 @@
 Tile Acceptance calculator
 """
 import json
-from collections import defaultdict
+from collections import Counter, defaultdict
 from enum import Enum
-from typing import Iterable
+from typing import Callable, Iterable
 
 from acceptance import get_tile_acceptance_of_groups
+from group_finder import clear_group_cache
 from hand_types.all_pungs import can_construct_all_pungs
 from hand_types.all_types import can_construct_all_types
 from hand_types.basic import can_construct_hand
@@ -54,10 +55,17 @@ class HandType(Enum):
     BASIC = "Basic"
 
 
+def _sorted_tiles(tiles: Iterable[MahjongTile]) -> MahjongTiles:
+    """Tiles in display order, sorted on their index instead of pairwise __lt__ calls"""
+    return sorted(tiles, key=lambda tile: tile.index)
+
+
 def _print_shanten(best_groups, natural_size) -> str:
-    real_shanten = min(len(residue) for _, residue in best_groups)
+    # hand type results only keep their smallest residues, so the first one
+    # gives the shanten (as in analyze_hand)
     groups, residue = best_groups[0]
-    nb_tiles = sum(len(group) for group in groups) + len(residue)
+    real_shanten = len(residue)
+    nb_tiles = sum(len(group) for group in groups) + real_shanten
     to_discard = nb_tiles - natural_size
     if nb_tiles == natural_size:
         return f"{real_shanten} away ({len(best_groups)} results)\n"
@@ -127,85 +135,89 @@ def _print_result_for_basic(best_groups, hand, basic_yakus) -> str:
 
 
 def _get_acceptance_tile_number(
-    hand: MahjongHand, acceptance_tiles: Iterable[MahjongTile]
+    hand: MahjongHand,
+    acceptance_tiles: Iterable[MahjongTile],
+    tile_counts: Counter | None = None,
 ) -> int:
-    total = 0
-    for tile in acceptance_tiles:
-        total += 4 - hand.hand_tiles.count(tile)
-    return total
+    """
+    number of tiles left that are accepted, seen from the hand
+    :param hand: hand
+    :param acceptance_tiles: accepted tiles
+    :param tile_counts: occurrences of each tile in the hand, to reuse it across calls
+    :return: the number of accepted tiles not in the hand
+    """
+    if tile_counts is None:
+        tile_counts = Counter(hand.hand_tiles)
+    return sum(4 - tile_counts[tile] for tile in acceptance_tiles)
+
+
+_HAND_TYPE_HANDLERS: dict[HandType, Callable] = {
+    HandType.MIXED_SHIFTED: lambda hand, precomputed, cache: (
+        can_construct_with_3_group_pattern(hand, "ABCaBCDbCDEc", cache)
+    ),
+    HandType.MIXED_STRAIGHT: lambda hand, precomputed, cache: (
+        can_construct_with_3_group_pattern(hand, "123a456b789c", cache)
+    ),
+    HandType.TRIPLE_CHOWS: lambda hand, precomputed, cache: (
+        can_construct_with_3_group_pattern(hand, "ABCaABCbABCc", cache)
+    ),
+    HandType.PURE_SHIFTED: lambda hand, precomputed, cache: (
+        can_construct_with_3_group_pattern(hand, "ABCCDEEFGa", cache)
+    ),
+    HandType.PURE_STRAIGHT: lambda hand, precomputed, cache: (
+        can_construct_with_3_group_pattern(hand, "123456789a", cache)
+    ),
+    HandType.SEVEN_PAIRS: lambda hand, precomputed, cache: (
+        can_construct_seven_pairs(hand)
+    ),
+    HandType.ALL_PUNGS: lambda hand, precomputed, cache: can_construct_all_pungs(hand),
+    HandType.HALF_FLUSH: lambda hand, precomputed, cache: (
+        can_construct_half_flush_from_precomputed(hand, precomputed)
+    ),
+    HandType.ALL_TYPES: lambda hand, precomputed, cache: can_construct_all_types(hand),
+    HandType.KNITTED: lambda hand, precomputed, cache: (
+        can_construct_knitted(hand, cache)
+    ),
+    HandType.FIRST_OR_LAST_N_TILES: lambda hand, precomputed, cache: (
+        can_construct_first_last_hand_from_precomputed(hand, precomputed)
+    ),
+    HandType.SYMMETRY: lambda hand, precomputed, cache: (
+        can_construct_symmetry_from_precomputed(hand, precomputed)
+    ),
+}
 
 
 def _can_construct_hand_type(
     hand_type: HandType, hand: MahjongHand, precomputed, cache: dict
 ) -> tuple[list[MahjongCombination], set[MahjongTile]]:
-    result: list[MahjongCombination] = []
-    acceptance: set[MahjongTile] = set()
-    match hand_type:
-        case HandType.MIXED_SHIFTED:
-            result, acceptance = can_construct_with_3_group_pattern(
-                hand, "ABCaBCDbCDEc", cache
-            )
-        case HandType.MIXED_STRAIGHT:
-            result, acceptance = can_construct_with_3_group_pattern(
-                hand, "123a456b789c", cache
-            )
-        case HandType.TRIPLE_CHOWS:
-            result, acceptance = can_construct_with_3_group_pattern(
-                hand, "ABCaABCbABCc", cache
-            )
-        case HandType.PURE_SHIFTED:
-            result, acceptance = can_construct_with_3_group_pattern(
-                hand, "ABCCDEEFGa", cache
-            )
-        case HandType.PURE_STRAIGHT:
-            result, acceptance = can_construct_with_3_group_pattern(
-                hand, "123456789a", cache
-            )
-        case HandType.SEVEN_PAIRS:
-            result, acceptance = can_construct_seven_pairs(hand)
-        case HandType.ALL_PUNGS:
-            result, acceptance = can_construct_all_pungs(hand)
-        case HandType.HALF_FLUSH:
-            result, acceptance = can_construct_half_flush_from_precomputed(
-                hand, precomputed
-            )
-        case HandType.ALL_TYPES:
-            result, acceptance = can_construct_all_types(hand)
-        case HandType.KNITTED:
-            result, acceptance = can_construct_knitted(hand, cache)
-        case HandType.FIRST_OR_LAST_N_TILES:
-            result, acceptance = can_construct_first_last_hand_from_precomputed(
-                hand, precomputed
-            )
-        case HandType.SYMMETRY:
-            result, acceptance = can_construct_symmetry_from_precomputed(
-                hand, precomputed
-            )
-    return result, acceptance
+    handler = _HAND_TYPE_HANDLERS.get(hand_type)
+    if handler is None:
+        return [], set()
+    return handler(hand, precomputed, cache)
 
 
 def _get_most_useless_tile_from(most_useless_tiles: MahjongTiles, candidates_occurrences):
-    max_occurrence = max(
-        len(candidates_occurrences[tile]) for tile in most_useless_tiles
-    )
+    occurrences = {
+        tile: len(candidates_occurrences[tile]) for tile in most_useless_tiles
+    }
+    max_occurrence = max(occurrences.values())
     best_candidates = [
-        tile
-        for tile in most_useless_tiles
-        if len(candidates_occurrences[tile]) == max_occurrence
+        tile for tile in most_useless_tiles if occurrences[tile] == max_occurrence
     ]
     if len(best_candidates) == 1:
         return best_candidates[0]
     honors = get_tiles_from_family(best_candidates, Family.HONOR)
     if honors:
         return honors[0]
-    return sorted(best_candidates, key=lambda tile: abs(5 - tile.number))[-1]
+    # farthest from the middle, the last one on ties
+    return max(reversed(best_candidates), key=lambda tile: abs(5 - tile.number))
 
 
 def _print_best_discard_choice(best_results, results, acceptance, hand):
     best_discard_tile, acceptance_after_discard, acceptance_nb, _by_type = (
         _get_best_discard_choice(best_results, results, acceptance, hand)
     )
-    return f"Tile to discard next: {best_discard_tile} (acceptance: {sorted(acceptance_after_discard)} -> {acceptance_nb} tiles)\n"
+    return f"Tile to discard next: {best_discard_tile} (acceptance: {_sorted_tiles(acceptance_after_discard)} -> {acceptance_nb} tiles)\n"
 
 
 _BASIC_MAIN_YAKU_MIN_POINTS = 4
@@ -324,14 +336,13 @@ def _get_best_discard_choice(
         raise ValueError("No tile to discard")
 
     # Comparer par nombre de tuiles acceptées (après union)
-    best_score = max(
-        _get_acceptance_tile_number(hand, acc) for acc in candidate_acceptance.values()
-    )
-    best_tiles = [
-        tile
+    tile_counts = Counter(hand.hand_tiles)
+    scores = {
+        tile: _get_acceptance_tile_number(hand, acc, tile_counts)
         for tile, acc in candidate_acceptance.items()
-        if _get_acceptance_tile_number(hand, acc) == best_score
-    ]
+    }
+    best_score = max(scores.values())
+    best_tiles = [tile for tile, score in scores.items() if score == best_score]
     to_discard = _get_most_useless_tile_from(best_tiles, candidate_type_occurrence)
     return (
         to_discard,
@@ -357,22 +368,18 @@ def get_discard_choices(
     if not candidate_acceptance:
         raise ValueError("No tile to discard")
 
-    best_score = max(
-        _get_acceptance_tile_number(hand, acc) for acc in candidate_acceptance.values()
-    )
-    best_tiles = [
-        tile
+    tile_counts = Counter(hand.hand_tiles)
+    scores = {
+        tile: _get_acceptance_tile_number(hand, acc, tile_counts)
         for tile, acc in candidate_acceptance.items()
-        if _get_acceptance_tile_number(hand, acc) == best_score
-    ]
+    }
+    best_score = max(scores.values())
+    best_tiles = [tile for tile, score in scores.items() if score == best_score]
     recommended = _get_most_useless_tile_from(best_tiles, candidate_type_occurrence)
 
     ranked = sorted(
         candidate_acceptance,
-        key=lambda tile: (
-            -_get_acceptance_tile_number(hand, candidate_acceptance[tile]),
-            tile.index,
-        ),
+        key=lambda tile: (-scores[tile], tile.index),
     )
     choices = []
     for tile in ranked:
@@ -381,7 +388,7 @@ def get_discard_choices(
             (
                 tile,
                 acc,
-                _get_acceptance_tile_number(hand, acc),
+                scores[tile],
                 dict(candidate_acceptance_by_type[tile]),
                 tile is recommended,
             )
@@ -438,26 +445,67 @@ def get_acceptance_by_hand_type(results, best_results, acceptance, basic_yakus=N
 _ANALYZE_CACHE: dict = {}
 _ANALYZE_CACHE_MAX = 200_000
 
+# ordered tiles signature -> {hand type: (results, acceptance)} of all the
+# structural hand types: they do not depend on the winds nor on include_basic,
+# so the full and fast (BASIC-free) analyses of a same hand share them. They are
+# only stored and served all together for analyses of every hand type: the
+# leftover cache shared by the pattern hand types is keyed by tiles only, so a
+# hand type result depends on which hand types ran before it in the same
+# analysis. The key keeps the tile order, which residues and combination order
+# (and so discard tie-breaks) depend on
+_HAND_TYPE_CACHE: dict = {}
+_HAND_TYPE_CACHE_MAX = 200_000
 
-def _hand_signature(hand: MahjongHand, prevalent_wind, seat_wind, include_basic):
-    """Canonical, hashable identity of a hand for the transposition cache.
+
+def _tiles_signature(hand: MahjongHand):
+    """Canonical, hashable identity of the tiles of a hand.
 
     Tiles are interned flyweights, so the sorted tuple is a stable multiset key.
     """
     tiles = tuple(sorted(hand.hand_tiles, key=lambda tile: tile.index))
-    return (
-        tiles,
-        frozenset(hand.declared_tiles),
-        frozenset(hand.kongs),
-        prevalent_wind,
-        seat_wind,
-        include_basic,
-    )
+    return tiles, frozenset(hand.declared_tiles), frozenset(hand.kongs)
+
+
+def _ordered_tiles_signature(hand: MahjongHand):
+    """Hashable identity of the tiles of a hand, in hand order."""
+    return tuple(hand.hand_tiles), frozenset(hand.declared_tiles), frozenset(hand.kongs)
+
+
+def _hand_signature(hand: MahjongHand, prevalent_wind, seat_wind, include_basic):
+    """Canonical, hashable identity of a hand for the transposition cache."""
+    return (*_tiles_signature(hand), prevalent_wind, seat_wind, include_basic)
 
 
 def clear_analyze_cache() -> None:
-    """Empty the transposition cache (call between independent benchmark runs)."""
+    """Empty the transposition caches (call between independent benchmark runs)."""
     _ANALYZE_CACHE.clear()
+    _HAND_TYPE_CACHE.clear()
+    clear_group_cache()
+
+
+def _get_structural_hand_types(hand: MahjongHand, hand_types, use_cache: bool):
+    """(results, acceptance) of the structural hand types among hand_types.
+
+    :param use_cache: reuse/populate _HAND_TYPE_CACHE, only valid when hand_types
+        holds every hand type (see _HAND_TYPE_CACHE)
+    """
+    cache_key = _ordered_tiles_signature(hand) if use_cache else None
+    cached = _HAND_TYPE_CACHE.get(cache_key) if use_cache else None
+    if cached is not None:
+        return cached
+
+    structural_hand_types = [ht for ht in hand_types if ht != HandType.BASIC]
+    if not structural_hand_types:
+        return {}
+    precomputed = precompute_constraints(hand)
+    cache: dict = {}
+    computed = {
+        hand_type: _can_construct_hand_type(hand_type, hand, precomputed, cache)
+        for hand_type in structural_hand_types
+    }
+    if use_cache and len(_HAND_TYPE_CACHE) < _HAND_TYPE_CACHE_MAX:
+        _HAND_TYPE_CACHE[cache_key] = computed
+    return computed
 
 
 def analyze_hand(
@@ -502,8 +550,9 @@ def analyze_hand(
 
     acceptance = {}
 
-    precomputed = precompute_constraints(hand)
-    cache: dict = {}
+    structural_hand_types = _get_structural_hand_types(
+        hand, hand_types, cache_key is not None
+    )
     basic_yakus = []
 
     for hand_type in hand_types:
@@ -513,9 +562,7 @@ def analyze_hand(
             )
             basic_yakus.extend(yakus)
         else:
-            hand_results, hand_acceptance = _can_construct_hand_type(
-                hand_type, hand, precomputed, cache
-            )
+            hand_results, hand_acceptance = structural_hand_types[hand_type]
         if not hand_results or not hand_results[0]:
             continue
         away = len(hand_results[0][1])
@@ -601,33 +648,35 @@ def _print_hand_analysis(
 ) -> str:
     to_display = results.keys() if display_all else best_results
     to_display = sorted(to_display, key=lambda t: len(results[t][0][1]))
-    printed_result = f"Analyzed hand : {hand}\n"
+    separator = "-----------------------------\n"
+    tile_counts = Counter(hand.hand_tiles)
+    printed_result = [f"Analyzed hand : {hand}\n", separator]
     if hand.needs_to_discard():
-        printed_result += "-----------------------------\n"
-        printed_result += _print_best_discard_choice(
-            best_results, results, acceptance, hand
+        printed_result.append(
+            _print_best_discard_choice(best_results, results, acceptance, hand)
         )
     else:
-        printed_result += "-----------------------------\n"
         full_acceptance = get_simple_acceptance(results, best_results, acceptance)
-        acceptance_nb = _get_acceptance_tile_number(hand, full_acceptance)
-        printed_result += f"Full acceptance: {sorted(full_acceptance)} - {acceptance_nb} tiles\n"
+        acceptance_nb = _get_acceptance_tile_number(hand, full_acceptance, tile_counts)
+        printed_result.append(
+            f"Full acceptance: {_sorted_tiles(full_acceptance)} - {acceptance_nb} tiles\n"
+        )
     for result_type in to_display:
-        printed_result += "-----------------------------\n"
-        printed_result += result_type + "\n"
+        printed_result += [separator, result_type + "\n"]
         if result_type == HandType.BASIC.value:
-            printed_result += _print_result_for_basic(
-                results[result_type], hand, basic_yakus
+            printed_result.append(
+                _print_result_for_basic(results[result_type], hand, basic_yakus)
             )
         else:
-            printed_result += _print_result(results[result_type], hand)
-        printed_result += (
-            "Tile acceptance "
-            + str(sorted(acceptance[result_type]))
-            + f" ({_get_acceptance_tile_number(hand, acceptance[result_type])} tiles)\n"
+            printed_result.append(_print_result(results[result_type], hand))
+        acceptance_nb = _get_acceptance_tile_number(
+            hand, acceptance[result_type], tile_counts
+        )
+        printed_result.append(
+            f"Tile acceptance {_sorted_tiles(acceptance[result_type])} ({acceptance_nb} tiles)\n"
         )
-    printed_result += "-----------------------------\n"
-    return printed_result
+    printed_result.append(separator)
+    return "".join(printed_result)
 
 
 def _select_combo_indices(best_groups):
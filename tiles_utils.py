@@ -2,10 +2,25 @@
 functions and constants to get/generate tiles
 """
 
+import re
 from random import sample
 
 from mahjong_objects import MahjongTiles, Family, MahjongTile, MahjongHand
 
+# family denomination character -> Family, looked up by the parsers instead of
+# going through the Enum machinery (``char in Family`` / ``Family(char)``)
+_FAMILY_BY_CHAR = {family.value: family for family in Family}
+_FAMILY_CHARS = "".join(_FAMILY_BY_CHAR)
+# a tile pattern is a sequence of numbers each followed by their family
+_TILES_RE = re.compile(f"(?:[1-9]*[{_FAMILY_CHARS}])*")
+_TILE_GROUP_RE = re.compile(f"([1-9]*)([{_FAMILY_CHARS}])")
+# "1m" -> interned tile, including the out of range 8z and 9z the parser accepts
+_TILE_BY_STR = {
+    f"{number}{family.value}": MahjongTile(number=number, family=family)
+    for family in Family
+    for number in range(1, 10)
+}
+
 
 def generate_tile_pool(honor_tiles_multiplier=4) -> MahjongTiles:
     """
@@ -25,12 +40,19 @@ def generate_tile_pool(honor_tiles_multiplier=4) -> MahjongTiles:
     return pool
 
 
+_DEFAULT_TILE_POOL = tuple(generate_tile_pool())
+
+
 def generate_random_closed_hand(honor_tiles_multiplier=4):
     """
     generate a random hand
     :return: hand
     """
-    pool = generate_tile_pool(honor_tiles_multiplier)
+    pool = (
+        _DEFAULT_TILE_POOL
+        if honor_tiles_multiplier == 4
+        else generate_tile_pool(honor_tiles_multiplier)
+    )
     return MahjongHand(sample(pool, 13))
 
 
@@ -40,24 +62,22 @@ def parse_tiles(tiles: str) -> MahjongTiles:
     :param tiles: tiles pattern
     :return: list of tiles
     """
-    current_numbers: list[int] = []
-    parsed: MahjongTiles = []
+    if _TILES_RE.fullmatch(tiles) is None:
+        _raise_tiles_pattern_error(tiles)
+    return [
+        _TILE_BY_STR[num + char]
+        for numbers, char in _TILE_GROUP_RE.findall(tiles)
+        for num in numbers
+    ]
+
+
+def _raise_tiles_pattern_error(tiles: str):
     for char in tiles:
-        if char in "123456789":
-            current_numbers.append(int(char))
-        elif char in Family:
-            family = Family(char)
-            parsed += [
-                MahjongTile(number=num, family=family) for num in current_numbers
-            ]
-            current_numbers.clear()
-        else:
+        if char not in "123456789" and char not in _FAMILY_BY_CHAR:
             raise AttributeError(f"Unknown character {char}")
-    if current_numbers:
-        raise AttributeError(
-            f"Missing family denomination for {''.join(str(num) for num in current_numbers)}"
-        )
-    return parsed
+    raise AttributeError(
+        f"Missing family denomination for {tiles[len(tiles.rstrip('123456789')):]}"
+    )
 
 
 def parse_hand(tiles: str) -> MahjongHand:
@@ -80,8 +100,8 @@ def parse_hand(tiles: str) -> MahjongHand:
                 declared_group.append(int(char))
             elif reading_concealed_kong:
                 concealed_kong.append(int(char))
-        elif char in Family:
-            family = Family(char)
+        elif char in _FAMILY_BY_CHAR:
+            family = _FAMILY_BY_CHAR[char]
             if not current_numbers:
                 raise AttributeError("No number before family denomination")
             if reading_concealed_kong or reading_declared_group: